@@ -19,6 +19,12 @@ from mxnet.test_utils import *
 import time
 import argparse
 import os
+import itertools
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
 
 parser = argparse.ArgumentParser(description="Run sparse linear regression " \
                                              "with distributed kvstore",
@@ -48,16 +54,39 @@ parser.add_argument('--dummy-metric', type=int, default=0,
                     help='whether to call update_metric')
 
 
-def get_libsvm_data(data_dir, data_name, url, data_origin_name):
+def get_libsvm_data(data_dir, data_name, url):
     if not os.path.isdir(data_dir):
-        os.system("mkdir " + data_dir)
-    os.chdir(data_dir)
-    if (not os.path.exists(data_name)):
-        import urllib
-        zippath = os.path.join(data_dir, data_origin_name)
-        urllib.urlretrieve(url, zippath)
-        os.system("bzip2 -d %r" % data_origin_name)
-    os.chdir("..")
+        os.makedirs(data_dir)
+    path = os.path.join(data_dir, data_name)
+    if not os.path.exists(path):
+        try:
+            from urllib.request import urlopen
+        except ImportError:
+            from urllib2 import urlopen
+        import bz2
+        from contextlib import closing
+        # decompress the download as it arrives instead of after it finishes
+        decompressor = bz2.BZ2Decompressor()
+        tmp_path = path + '.part'
+        try:
+            with closing(urlopen(url)) as response, open(tmp_path, 'wb') as fout:
+                while True:
+                    chunk = response.read(1 << 20)
+                    if not chunk:
+                        break
+                    fout.write(decompressor.decompress(chunk))
+            # a closed connection looks like the end of the download, only a
+            # decompressor that reached the end of the stream rejects more input
+            try:
+                decompressor.decompress(b'')
+                raise IOError('incomplete download of ' + url)
+            except EOFError:
+                pass
+        except:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.rename(tmp_path, path)
 
 
 class DummyIter(mx.io.DataIter):
@@ -82,14 +111,12 @@ class DummyIter(mx.io.DataIter):
 # testing dataset sources
 avazu = {
     'data_name': 'avazu-app.t',
-    'data_origin_name': 'avazu-app.t.bz2',
     'url': "https://www.csie.ntu.edu.tw/~cjlin/libsvmtools/datasets/binary/avazu-app.t.bz2",
     'feature_dim': 1000000,
 }
 
 kdda = {
     'data_name': 'kdda.t',
-    'data_origin_name': 'kdda.t.bz2',
     'url': "https://www.csie.ntu.edu.tw/~cjlin/libsvmtools/datasets/binary/kdda.t.bz2",
     'feature_dim': 20216830,
 }
@@ -107,23 +134,71 @@ def get_sym(feature_dim):
      return model
 
 
-def row_sparse_pull(kv, key, data, slices, weight_array, priority):
-    # if have kvstore, need to pull corresponding rows of
-    # the weights to each context
+def get_slice_bounds(slices):
+    # (start, stop) of each data slice, they are fixed for a bound module
+    return np.array([(s.start, s.stop) for s in slices], dtype=np.int64)
+
+
+def get_row_ids(data, slice_bounds):
     # column indices (NDArray type) of the csr data
-    # used as the row_idx of the weight row-sparse matrix
+    # used as the row_idx of the weight row-sparse matrix.
+    # indices blocks and copies the array, get it only once per batch
     row_indices = data.indices
-    if len(slices) == 1:
-        kv.row_sparse_pull(key, weight_array, priority=priority, row_ids=row_indices)
-    else:  # more than one slices, multi-GPU training. Need to retain weight rows according to data slices
-        # TODO(junwu):
-        # the following line blocks, may need to pre-compute
-        # and cache it outside the for loop
-        indptr = data.indptr.asnumpy()
-        row_idx_array = []
-        for s in slices:
-            row_idx_array.append(row_indices[indptr[s.start]:indptr[s.stop]])
-        kv.row_sparse_pull(key, weight_array, priority=priority, row_ids=row_idx_array)
+    if slice_bounds is None:
+        return row_indices
+    # more than one slices, multi-GPU training. Need to retain weight rows according to data slices
+    # look up the offsets of all slices in indptr at once
+    offsets = data.indptr.asnumpy()[slice_bounds]
+    # slices are views sharing memory with row_indices, no operator is launched for them
+    return [row_indices[begin:end] for begin, end in offsets]
+
+
+class BatchPrefetcher(object):
+    "Fetch batches and compute their row ids to pull in a background thread"
+    def __init__(self, data_iter, num_batch, pull_row_ids, slice_bounds):
+        # a single slot keeps at most one batch ahead of the consumer
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._prefetch,
+                                       args=(data_iter, num_batch, pull_row_ids, slice_bounds))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _prefetch(self, data_iter, num_batch, pull_row_ids, slice_bounds):
+        try:
+            # stop after num_batch batches without fetching one more
+            for batch in itertools.islice(data_iter, num_batch):
+                # getting the row ids blocks until the iterator finishes writing the batch,
+                # doing it here overlaps the wait with computation
+                row_ids = None
+                if pull_row_ids:
+                    row_ids = get_row_ids(batch.data[0], slice_bounds)
+                self.queue.put((batch, row_ids))
+        except Exception as e:
+            # hand errors, e.g. from parsing the data, over to the consumer
+            # instead of ending the epoch early as if it had completed
+            self.queue.put(e)
+        else:
+            self.queue.put(None)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        item = self.queue.get()
+        if item is None or isinstance(item, Exception):
+            self.thread.join()
+            if item is None:
+                raise StopIteration
+            raise item
+        return item
+
+    __next__ = next
+
+
+def row_sparse_pull(kv, key, weight_array, priority, row_ids):
+    # if have kvstore, need to pull corresponding rows of
+    # the weights to each context, row_ids are pre-computed by BatchPrefetcher
+    kv.row_sparse_pull(key, weight_array, priority=priority, row_ids=row_ids)
 
 
 if __name__ == '__main__':
@@ -166,8 +241,7 @@ if __name__ == '__main__':
     data_dir = os.path.join(os.getcwd(), 'data')
     path = os.path.join(data_dir, metadata['data_name'])
     if not os.path.exists(path):
-        get_libsvm_data(data_dir, metadata['data_name'], metadata['url'],
-                        metadata['data_origin_name'])
+        get_libsvm_data(data_dir, metadata['data_name'], metadata['url'])
         assert os.path.exists(path)
 
     # data iterator
@@ -209,14 +283,19 @@ if __name__ == '__main__':
     logging.debug('start training ...')
     start = time.time()
     data_iter = iter(train_data)
+    slices = mod._exec_group.slices
+    # row ids of each slice are only needed for multi-device training
+    slice_bounds = get_slice_bounds(slices) if len(slices) > 1 else None
     for epoch in range(num_epoch):
         nbatch = 0
         end_of_batch = False
         data_iter.reset()
         metric.reset()
-        next_batch = next(data_iter)
+        # batches are fetched in the background while the current one is computed
+        prefetcher = BatchPrefetcher(data_iter, num_batch, kv is not None, slice_bounds)
+        next_batch, row_ids = next(prefetcher)
         if kv is not None:
-            row_sparse_pull(kv, 'w', next_batch.data[0], mod._exec_group.slices, weight_array, -index)
+            row_sparse_pull(kv, 'w', weight_array, -index, row_ids)
         while not end_of_batch:
             nbatch += 1
             batch = next_batch
@@ -227,21 +306,25 @@ if __name__ == '__main__':
 
             try:
                 # pre fetch next batch
-                next_batch = next(data_iter)
-                if nbatch == num_batch:
-                    raise StopIteration
+                next_batch, row_ids = next(prefetcher)
                 if kv is not None:
-                    row_sparse_pull(kv, 'w', next_batch.data[0], mod._exec_group.slices, weight_array, -index)
+                    row_sparse_pull(kv, 'w', weight_array, -index, row_ids)
             except StopIteration:
                 end_of_batch = True
             # accumulate prediction accuracy
             if args.dummy_metric == 0:
                 mod.update_metric(metric, batch.label)
-            else:  # call waitall to replace update_metric as sync point
-                mx.nd.waitall()  # sync point for the current minibatch
+            else:  # wait for the outputs to replace update_metric as sync point
+                # unlike waitall, this does not block on the prefetched batches.
+                # wait on the per-device outputs, merging them would add a copy
+                for outputs in mod.get_outputs(merge_multi_context=False):
+                    for output in outputs:
+                        output.wait_to_read()  # sync point for the current minibatch
         logging.info('epoch %d, %s' % (epoch, metric.get()))
         if epoch == 0:
             print "num_batches = ", nbatch
+    # make sure the last backward, update and pull are finished before timing
+    mx.nd.waitall()
     if profiler:
         mx.profiler.profiler_set_state('stop')
     end = time.time()
@@ -18,7 +18,7 @@
 # pylint: skip-file
 from data import mnist_iterator
 import mxnet as mx
-import numpy as np
+import math
 import logging
 
 data = mx.symbol.Variable('data')
@@ -42,7 +42,9 @@ model = mx.model.FeedForward(
     learning_rate = 0.1, momentum = 0.9, wd = 0.00001)
 
 def norm_stat(d):
-    return mx.nd.norm(d)/np.sqrt(d.size)
+    # keep the statistic as an NDArray so it is computed asynchronously,
+    # the monitor only copies it to host when printing
+    return mx.nd.norm(d) / math.sqrt(d.size)
 mon = mx.mon.Monitor(100, norm_stat)
 model.fit(X=train, eval_data=val, monitor=mon,
           batch_end_callback = mx.callback.Speedometer(100, 100))
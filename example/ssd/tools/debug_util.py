@@ -9,11 +9,13 @@ def infer_net_shapes(net):
     '''
     infert net shapes
     '''
-    for inter in net.get_internals():
+    internals = net.get_internals()
+    # infer the shapes of all internals in one pass instead of once per internal
+    _,out_shapes,_ = internals.infer_shape_partial(data=(1,3,224,224))
+    for inter, out_shape in zip(internals, out_shapes):
         #print('%s is %s' % (inter.name,inter.list_arguments()))
         if 'data' in inter.list_arguments():
-            _,out_shape,_ = inter.infer_shape(data=(1,3,224,224))
-            print('%s shape is %s'  % (inter.name, out_shape) )
+            print('%s shape is %s'  % (inter.name, [out_shape]) )
 
 
 if __name__ == '__main__':
@@ -20,7 +20,9 @@
 """ losses for training neural networks """
 from __future__ import absolute_import
 
-from .. import ndarray
+import numpy as np
+
+from .. import ndarray, autograd
 from ..base import numeric_types
 from .block import HybridBlock
 
@@ -46,19 +48,80 @@ def _apply_weighting(F, loss, weight=None, sample_weight=None):
         Weighted loss
     """
     if sample_weight is not None:
-        loss = F.broadcast_mul(loss, sample_weight)
+        if F is ndarray and sample_weight.dtype != loss.dtype:
+            # weight in loss's dtype instead of requiring a float32 loss
+            sample_weight = F.cast(sample_weight, dtype=loss.dtype)
+        if _can_write_inplace(F) and _broadcasts_to(sample_weight.shape, loss.shape):
+            # loss is always a temporary created by the caller
+            F.broadcast_mul(loss, sample_weight, out=loss)
+        else:
+            loss = F.broadcast_mul(loss, sample_weight)
 
     if weight is not None:
         assert isinstance(weight, numeric_types), "weight must be a number"
-        loss = loss * weight
+        if _can_write_inplace(F):
+            loss *= weight
+        else:
+            loss = loss * weight
 
     return loss
 
+def _broadcasts_to(shape, target):
+    """Whether an array of `shape` broadcast with one of `target` shape
+    results in `target` shape."""
+    return len(shape) <= len(target) and \
+        all(s in (1, t) for s, t in zip(reversed(shape), reversed(target)))
+
+def _can_write_inplace(F):
+    """Whether intermediate results can be overwritten in place.
+
+    This is only possible for NDArray inputs while autograd is not
+    recording, which saves allocating a new array for each step of the
+    loss computation, e.g. when evaluating a validation set.
+    """
+    return F is ndarray and not autograd.is_recording()
+
+def _unary_inplace(F, op, data):
+    """Apply unary operator `op` on the intermediate `data`, reusing
+    its memory for the result when possible."""
+    if _can_write_inplace(F):
+        return op(data, out=data)
+    return op(data)
+
+def _mean_over_nonbatch(F, loss, batch_axis):
+    """Average loss over all axes except `batch_axis`.
+
+    `F.mean` with `exclude=True` already reduces all those axes in a single
+    pass. When loss only has the batch axis there is nothing to reduce, so
+    on the NDArray path the extra copy made by `F.mean` is skipped.
+    """
+    if F is ndarray and loss.ndim == 1 and batch_axis in (0, -1):
+        return loss
+    if F is ndarray and loss.dtype == np.float16:
+        # reduce operators accumulate in their input dtype, which is inexact
+        # for float16 once partial sums exceed 2048. Average in float32.
+        # Cast, unlike astype, is recorded by autograd.
+        loss_fp32 = F.cast(loss, dtype='float32')
+        return F.cast(F.mean(loss_fp32, axis=batch_axis, exclude=True), dtype=loss.dtype)
+    return F.mean(loss, axis=batch_axis, exclude=True)
+
 def _reshape_label_as_output(F, output, label):
     # for symbolic output.shape is not available so we reshape
     # to empty shape and let it be inferred from output's shape
     # via the '-' operator later.
-    return label.reshape(output.shape) if F is ndarray else label.reshape(())
+    if F is not ndarray:
+        return label.reshape(())
+    # shape is host-side metadata, reading it does not wait for
+    # computation. Skip creating a reshaped view if it is not needed.
+    return label if label.shape == output.shape else label.reshape(output.shape)
+
+def _cast_label_as_output(F, output, label):
+    # compute the loss in output's dtype, e.g. float16 for mixed precision
+    # training, instead of requiring a float32 output. Only for losses
+    # that stay accurate in float16.
+    if F is ndarray and label.dtype != output.dtype:
+        return F.cast(label, dtype=output.dtype)
+    return label
 
 class Loss(HybridBlock):
     """Base class for loss.
@@ -118,10 +181,11 @@ class L2Loss(Loss):
         super(L2Loss, self).__init__(weight, batch_axis, **kwargs)
 
     def hybrid_forward(self, F, output, label, sample_weight=None):
+        label = _cast_label_as_output(F, output, label)
         label = _reshape_label_as_output(F, output, label)
-        loss = F.square(output - label)
+        loss = _unary_inplace(F, F.square, output - label)
         loss = _apply_weighting(F, loss, self._weight/2, sample_weight)
-        return F.mean(loss, axis=self._batch_axis, exclude=True)
+        return _mean_over_nonbatch(F, loss, self._batch_axis)
 
 
 class L1Loss(Loss):
@@ -148,10 +212,11 @@ class L1Loss(Loss):
         super(L1Loss, self).__init__(weight, batch_axis, **kwargs)
 
     def hybrid_forward(self, F, output, label, sample_weight=None):
+        label = _cast_label_as_output(F, output, label)
         label = _reshape_label_as_output(F, output, label)
-        loss = F.abs(output - label)
+        loss = _unary_inplace(F, F.abs, output - label)
         loss = _apply_weighting(F, loss, self._weight, sample_weight)
-        return F.mean(loss, axis=self._batch_axis, exclude=True)
+        return _mean_over_nonbatch(F, loss, self._batch_axis)
 
 
 class SigmoidBinaryCrossEntropyLoss(Loss):
@@ -186,12 +251,14 @@ class SigmoidBinaryCrossEntropyLoss(Loss):
     def hybrid_forward(self, F, output, label, sample_weight=None):
         label = _reshape_label_as_output(F, output, label)
         if not self._from_sigmoid:
-            max_val = F.maximum(-output, 0)
-            loss = output - output*label + max_val + F.log(F.exp(-max_val)+F.exp(-output-max_val))
+            # softrelu computes log(1 + exp(x)) without overflow for large x
+            # in a single pass, and its gradient is exactly sigmoid(x)
+            loss = F.Activation(output, act_type='softrelu') - output*label
         else:
-            loss = -(F.log(output+1e-8)*label + F.log(1.-output+1e-8)*(1.-label))
+            loss = -(_unary_inplace(F, F.log, output+1e-8)*label +
+                     _unary_inplace(F, F.log, 1.-output+1e-8)*(1.-label))
         loss = _apply_weighting(F, loss, self._weight, sample_weight)
-        return F.mean(loss, axis=self._batch_axis, exclude=True)
+        return _mean_over_nonbatch(F, loss, self._batch_axis)
 
 SigmoidBCELoss = SigmoidBinaryCrossEntropyLoss
 
@@ -208,6 +275,8 @@ class SoftmaxCrossEntropyLoss(Loss):
 
     Label's shape should be output's shape without the `axis` dimension. i.e. for
     `output.shape` = (1,2,3,4) and axis = 2, `label.shape` should be (1,2,4).
+    Label is used as is for indexing, so a compact dtype such as `uint8` can be
+    passed directly when the number of classes allows it.
 
     If `sparse_label` is `False`, label should contain probability distribution
     with the same shape as output:
@@ -245,13 +314,15 @@ class SoftmaxCrossEntropyLoss(Loss):
 
     def hybrid_forward(self, F, output, label, sample_weight=None):
         if not self._from_logits:
-            output = F.log_softmax(output)
+            # normalize along the same axis the label is picked from
+            output = F.log_softmax(output, axis=self._axis)
         if self._sparse_label:
-            loss = -F.pick(output, label, axis=self._axis, keepdims=True)
+            loss = F.pick(output, label, axis=self._axis, keepdims=True)
         else:
-            loss = -F.sum(output*label, axis=self._axis, keepdims=True)
+            loss = F.sum(output*label, axis=self._axis, keepdims=True)
+        loss = _unary_inplace(F, F.negative, loss)
         loss = _apply_weighting(F, loss, self._weight, sample_weight)
-        return F.mean(loss, axis=self._batch_axis, exclude=True)
+        return _mean_over_nonbatch(F, loss, self._batch_axis)
 
 SoftmaxCELoss = SoftmaxCrossEntropyLoss
 
@@ -292,6 +363,6 @@ class KLDivLoss(Loss):
     def hybrid_forward(self, F, output, label, sample_weight=None):
         if not self._from_logits:
             output = F.log_softmax(output)
-        loss = label * (F.log(label+1e-8) - output)
+        loss = label * (_unary_inplace(F, F.log, label+1e-8) - output)
         loss = _apply_weighting(F, loss, self._weight, sample_weight)
-        return F.mean(loss, axis=self._batch_axis, exclude=True)
+        return _mean_over_nonbatch(F, loss, self._batch_axis)
@@ -42,7 +42,11 @@ def test_MNISTIter():
     # test_loop
     nbatch = 60000 / batch_size
     batch_count = 0
-    for batch in train_dataiter:
+    # iter_next only advances the iterator, without wrapping
+    # each batch in a DataBatch as iterating over it does.
+    # reset first to drop the batch loaded at construction.
+    train_dataiter.reset()
+    while train_dataiter.iter_next():
         batch_count += 1
     assert(nbatch == batch_count)
     # test_reset
@@ -72,24 +76,26 @@ def test_Cifar10Rec():
             batch_size=100,
             preprocess_threads=4,
             prefetch_buffer=1)
-    labelcount = [0 for i in range(10)]
+    labelcount = np.zeros(10, dtype=np.int64)
     batchcount = 0
     for batch in dataiter:
-        npdata = batch.data[0].asnumpy().flatten().sum()
+        npdata = mx.nd.sum(batch.data[0]).asscalar()
         sys.stdout.flush()
         batchcount += 1
         nplabel = batch.label[0].asnumpy()
-        for i in range(nplabel.shape[0]):
-            labelcount[int(nplabel[i])] += 1
+        labelcount += np.bincount(nplabel.astype(np.int64), minlength=10)
     for i in range(10):
         assert(labelcount[i] == 5000)
 
+def _init_NDArrayIter_data():
+    # data[i] = label[i] = i / 100
+    values = np.arange(1000) / 100
+    data = np.broadcast_to(values.reshape(1000, 1, 1), (1000, 2, 2)).astype(np.float64)
+    label = values.reshape(1000, 1).astype(np.float64)
+    return data, label
+
 def test_NDArrayIter():
-    data = np.ones([1000, 2, 2])
-    label = np.ones([1000, 1])
-    for i in range(1000):
-        data[i] = i / 100
-        label[i] = i / 100
+    data, label = _init_NDArrayIter_data()
     dataiter = mx.io.NDArrayIter(data, label, 128, True, last_batch_handle='pad')
     batchidx = 0
     for batch in dataiter:
@@ -97,12 +103,11 @@ def test_NDArrayIter():
     assert(batchidx == 8)
     dataiter = mx.io.NDArrayIter(data, label, 128, False, last_batch_handle='pad')
     batchidx = 0
-    labelcount = [0 for i in range(10)]
+    labelcount = np.zeros(10, dtype=np.int64)
     for batch in dataiter:
         label = batch.label[0].asnumpy().flatten()
-        assert((batch.data[0].asnumpy()[:,0,0] == label).all())
-        for i in range(label.shape[0]):
-            labelcount[int(label[i])] += 1
+        assert((batch.data[0][:,0,0].asnumpy() == label).all())
+        labelcount += np.bincount(label.astype(np.int64), minlength=10)
 
     for i in range(10):
         if i == 0:
@@ -114,20 +119,19 @@ def test_NDArrayIter_h5py():
     if not h5py:
         return
 
-    data = np.ones([1000, 2, 2])
-    label = np.ones([1000, 1])
-    for i in range(1000):
-        data[i] = i / 100
-        label[i] = i / 100
+    data, label = _init_NDArrayIter_data()
 
     try:
         os.remove("ndarraytest.h5")
     except OSError:
         pass
     with h5py.File("ndarraytest.h5") as f:
-        f.create_dataset("data", data=data)
-        f.create_dataset("label", data=label)
+        # align chunks with the batch size NDArrayIter reads with
+        f.create_dataset("data", data=data, chunks=(128, 2, 2))
+        f.create_dataset("label", data=label, chunks=(128, 1))
 
+        # the h5py datasets are passed as is rather than read into numpy arrays
+        # first, since reading them batch by batch is what is tested here
         dataiter = mx.io.NDArrayIter(f["data"], f["label"], 128, True, last_batch_handle='pad')
         batchidx = 0
         for batch in dataiter:
@@ -135,12 +139,11 @@ def test_NDArrayIter_h5py():
         assert(batchidx == 8)
 
         dataiter = mx.io.NDArrayIter(f["data"], f["label"], 128, False, last_batch_handle='pad')
-        labelcount = [0 for i in range(10)]
+        labelcount = np.zeros(10, dtype=np.int64)
         for batch in dataiter:
             label = batch.label[0].asnumpy().flatten()
-            assert((batch.data[0].asnumpy()[:,0,0] == label).all())
-            for i in range(label.shape[0]):
-                labelcount[int(label[i])] += 1
+            assert((batch.data[0][:,0,0].asnumpy() == label).all())
+            labelcount += np.bincount(label.astype(np.int64), minlength=10)
 
     try:
         os.remove("ndarraytest.h5")
@@ -160,8 +163,10 @@ def test_NDArrayIter_csr():
     num_cols = rnd.randint(1, 20)
     batch_size = rnd.randint(1, num_rows)
     shape = (num_rows, num_cols)
-    csr, _ = rand_sparse_ndarray(shape, 'csr')
-    dns = csr.asnumpy()
+    dns = np.random.uniform(size=shape).astype('float32')
+    dns[dns < 0.7] = 0
+    sp_csr = sp.csr_matrix(dns)
+    csr = mx.nd.sparse.csr_matrix(sp_csr.data, sp_csr.indptr, sp_csr.indices, shape)
 
     # make iterators
     csr_iter = iter(mx.io.NDArrayIter(csr, csr, batch_size))
@@ -177,51 +182,52 @@ def test_NDArrayIter_csr():
 
 def test_LibSVMIter():
     def get_data(data_dir, data_name, url, data_origin_name):
+        data_path = os.path.join(data_dir, data_name)
+        if os.path.exists(data_path):
+            return
         if not os.path.isdir(data_dir):
             os.system("mkdir " + data_dir)
-        os.chdir(data_dir)
-        if (not os.path.exists(data_name)):
-            if sys.version_info[0] >= 3:
-                from urllib.request import urlretrieve
-            else:
-                from urllib import urlretrieve
-            zippath = os.path.join(data_dir, data_origin_name)
-            urlretrieve(url, zippath)
-            import bz2
-            bz_file = bz2.BZ2File(data_origin_name, 'rb')
-            with open(data_name, 'wb') as fout:
-                try:
-                    content = bz_file.read()
-                    fout.write(content)
-                finally:
-                    bz_file.close()
-        os.chdir("..")
+        if sys.version_info[0] >= 3:
+            from urllib.request import urlretrieve
+        else:
+            from urllib import urlretrieve
+        zippath = os.path.join(data_dir, data_origin_name)
+        urlretrieve(url, zippath)
+        import bz2
+        import shutil
+        bz_file = bz2.BZ2File(zippath, 'rb')
+        with open(data_path, 'wb') as fout:
+            try:
+                # decompress in 1MB chunks instead of the whole file at once
+                shutil.copyfileobj(bz_file, fout, 1024 * 1024)
+            finally:
+                bz_file.close()
 
     def check_libSVMIter_synthetic():
         cwd = os.getcwd()
         data_path = os.path.join(cwd, 'data.t')
         label_path = os.path.join(cwd, 'label.t')
-        with open(data_path, 'w') as fout:
-            fout.write('1.0 0:0.5 2:1.2\n')
-            fout.write('-2.0\n')
-            fout.write('-3.0 0:0.6 1:2.4 2:1.2\n')
-            fout.write('4 2:-1.2\n')
+        with open(data_path, 'wb') as fout:
+            fout.write(b'1.0 0:0.5 2:1.2\n'
+                       b'-2.0\n'
+                       b'-3.0 0:0.6 1:2.4 2:1.2\n'
+                       b'4 2:-1.2\n')
 
-        with open(label_path, 'w') as fout:
-            fout.write('1.0\n')
-            fout.write('-2.0 0:0.125\n')
-            fout.write('-3.0 2:1.2\n')
-            fout.write('4 1:1.0 2:-1.2\n')
+        with open(label_path, 'wb') as fout:
+            fout.write(b'1.0\n'
+                       b'-2.0 0:0.125\n'
+                       b'-3.0 2:1.2\n'
+                       b'4 1:1.0 2:-1.2\n')
 
         data_dir = os.path.join(cwd, 'data')
         data_train = mx.io.LibSVMIter(data_libsvm=data_path, label_libsvm=label_path,
                                       data_shape=(3, ), label_shape=(3, ), batch_size=3)
 
-        first = mx.nd.array([[ 0.5, 0., 1.2], [ 0., 0., 0.], [ 0.6, 2.4, 1.2]])
-        second = mx.nd.array([[ 0., 0., -1.2], [ 0.5, 0., 1.2], [ 0., 0., 0.]])
+        first = np.array([[ 0.5, 0., 1.2], [ 0., 0., 0.], [ 0.6, 2.4, 1.2]])
+        second = np.array([[ 0., 0., -1.2], [ 0.5, 0., 1.2], [ 0., 0., 0.]])
         i = 0
         for batch in iter(data_train):
-            expected = first.asnumpy() if i == 0 else second.asnumpy()
+            expected = first if i == 0 else second
             assert_almost_equal(data_train.getdata().asnumpy(), expected)
             i += 1
 
@@ -26,10 +26,12 @@ str_keys = ['b', 'c', 'd']
 
 def init_kv(stype='default'):
     """init kv """
+    # not cached across tests: pushes and updaters change the state of the
+    # store, and it cannot be reset since keys can only be initialized once
     kv = mx.kv.create()
     # single
     kv.init(3, mx.nd.zeros(shape=shape, stype=stype))
-    # list
+    # list, init only reads the values so they can share one array
     kv.init(keys, [mx.nd.zeros(shape=shape, stype=stype)] * len(keys))
     return kv
 
@@ -44,7 +46,15 @@ def init_kv_with_str(stype='default'):
 
 def check_diff_to_scalar(A, x):
     """ assert A == x"""
-    assert(np.sum(np.abs((A - x).asnumpy())) == 0)
+    # reduce on the array's context and only copy the scalar result
+    assert(mx.nd.sum(mx.nd.abs(A - x)).asscalar() == 0)
+
+def check_diff_to_scalar_list(vals, x):
+    """ assert all arrays in vals == x"""
+    # a single check on the stacked arrays instead of one sync per array,
+    # arrays on other devices are copied to the context of the first one
+    ctx = vals[0].context
+    check_diff_to_scalar(mx.nd.stack(*[v.as_in_context(ctx) for v in vals]), x)
 
 
 def test_single_kv_pair():
@@ -64,24 +74,19 @@ def test_row_sparse_pull():
 
     def check_row_sparse_pull(kv, count):
         num_rows = shape[0]
-        vals = []
-        row_ids = []
-        all_row_ids = np.arange(num_rows)
-        for i in range(count):
-            vals.append(mx.nd.zeros(shape).tostype('row_sparse'))
-            row_id = np.random.randint(num_rows, size=num_rows)
-            row_ids.append(mx.nd.array(row_id, dtype='int64'))
+        # create the outputs as row_sparse directly instead of converting dense zeros
+        vals = [mx.nd.zeros(shape, stype='row_sparse') for i in range(count)]
+        row_ids_np = np.random.randint(num_rows, size=(count, num_rows))
+        row_ids = [mx.nd.array(row_id, dtype='int64') for row_id in row_ids_np]
         row_ids_to_pull = row_ids[0] if len(row_ids) == 1 else row_ids
         vals_to_pull = vals[0] if len(vals) == 1 else vals
 
         kv.row_sparse_pull('e', out=vals_to_pull, row_ids=row_ids_to_pull)
-        for val, row_id in zip(vals, row_ids):
-            retained = val.asnumpy()
-            excluded_row_ids = np.setdiff1d(all_row_ids, row_id.asnumpy())
-            for row in range(num_rows):
-                expected_val = np.zeros_like(retained[row])
-                expected_val += 0 if row in excluded_row_ids else 1
-                assert_almost_equal(retained[row], expected_val)
+        for val, row_id in zip(vals, row_ids_np):
+            # rows in row_id are retained as ones, the others are zeros
+            expected = np.zeros(shape)
+            expected[row_id] = 1
+            assert_almost_equal(val.asnumpy(), expected)
 
     check_row_sparse_pull(kv, 1)
     check_row_sparse_pull(kv, 4)
@@ -100,11 +105,11 @@ def test_init():
 def test_list_kv_pair():
     """list key-value pair push & pull"""
     def check_list_kv_pair(kv, key):
-        kv.push(key, [mx.nd.ones(shape)*4] * len(key))
-        val = [mx.nd.empty(shape)] * len(key)
+        # one array per key: pulling into a shared array would only check the last key
+        kv.push(key, [mx.nd.full(shape, 4) for _ in key])
+        val = [mx.nd.empty(shape) for _ in key]
         kv.pull(key, out=val)
-        for v in val:
-            check_diff_to_scalar(v, 4)
+        check_diff_to_scalar_list(val, 4)
 
     check_list_kv_pair(init_kv(), keys)
     check_list_kv_pair(init_kv_with_str(), str_keys)
@@ -124,17 +129,16 @@ def test_aggregator():
         kv.push(key, vals)
         kv.pull(key, out=vals)
 
-        for v in vals:
-            check_diff_to_scalar(v, num_devs)
+        check_diff_to_scalar_list(vals, num_devs)
 
-        # list
-        vals = [[mx.nd.ones(shape, d)*2.0 for d in devs]] * len(key_list)
+        # list: each device holds the values of all keys in one block and every
+        # key pushes and pulls its own row of it, rather than sharing one list
+        blocks = [mx.nd.ones((len(key_list),) + shape, d)*2.0 for d in devs]
+        vals = [[block[i] for block in blocks] for i in range(len(key_list))]
         kv.push(key_list, vals)
         kv.pull(key_list, out=vals)
 
-        for vv in vals:
-            for v in vv:
-                check_diff_to_scalar(v, num_devs * 2.0)
+        check_diff_to_scalar_list(blocks, num_devs * 2.0)
 
     check_aggregator(init_kv(), 3, keys)
     check_aggregator(init_kv_with_str(), 'a', str_keys)
@@ -146,37 +150,35 @@ def test_sparse_aggregator():
     stype = 'row_sparse'
     kv = init_kv_with_str(stype)
 
+    def sum_on_cpu(vals):
+        # reduce with a single operator and copy only the sum to host
+        return mx.nd.add_n(*[v.copyto(mx.cpu()) for v in vals]).asnumpy()
+
     # devices
     num_devs = 4
     devs = [mx.Context('cpu', i) for i in range(num_devs)]
 
     # single
     vals = [rand_ndarray(shape, stype).copyto(devs[i]) for i in range(num_devs)]
-    expected_sum = np.zeros(shape)
-    for v in vals:
-        expected_sum += v.asnumpy()
+    expected_sum = sum_on_cpu(vals)
 
     # prepare row_ids
     all_rows = mx.nd.array(np.arange(shape[0]), dtype='int64')
     kv.push('a', vals)
     kv.row_sparse_pull('a', out=vals, row_ids=[all_rows] * len(vals))
-    result_sum = np.zeros(shape)
-    for v in vals:
-        result_sum += v.asnumpy()
+    result_sum = sum_on_cpu(vals)
     assert_almost_equal(result_sum, expected_sum * num_devs)
 
     # list
-    vals = [[rand_ndarray(shape, stype).copyto(devs[i]) for i in range(num_devs)]] * len(keys)
-    expected_sum = np.zeros(shape)
-    for v in vals[0]:
-        expected_sum += v.asnumpy()
+    # one list of arrays per key, so that every key is pulled and checked
+    vals = [[rand_ndarray(shape, stype).copyto(devs[i]) for i in range(num_devs)]
+            for _ in str_keys]
+    expected_sums = [sum_on_cpu(vv) for vv in vals]
 
     kv.push(str_keys, vals)
     kv.row_sparse_pull(str_keys, out=vals, row_ids=[[all_rows] * num_devs] * len(vals))
-    for vv in vals:
-        result_sum = np.zeros(shape)
-        for v in vv:
-            result_sum += v.asnumpy()
+    for vv, expected_sum in zip(vals, expected_sums):
+        result_sum = sum_on_cpu(vv)
         assert_almost_equal(result_sum, expected_sum * num_devs)
 
 def updater(key, recv, local):
@@ -198,11 +200,10 @@ def test_updater(dev = 'cpu'):
         kv.push(key, vals)
         kv.pull(key, out=vals)
 
-        for v in vals:
-            check_diff_to_scalar(v, num_devs)
+        check_diff_to_scalar_list(vals, num_devs)
 
         # list
-        vals = [[mx.nd.ones(shape, d) for d in devs]] * len(key_list)
+        vals = [[mx.nd.ones(shape, d) for d in devs] for _ in key_list]
 
         num_push = 4
         for i in range(num_push):
@@ -210,9 +211,7 @@ def test_updater(dev = 'cpu'):
 
         kv.pull(key_list, out=vals)
 
-        for vv in vals:
-            for v in vv:
-                check_diff_to_scalar(v, num_devs * num_push)
+        check_diff_to_scalar_list([v for vv in vals for v in vv], num_devs * num_push)
 
     kv = init_kv()
     kv._set_updater(updater)
@@ -228,9 +227,13 @@ def test_get_type():
     assert kv.type == kvtype
 
 def test_invalid_pull():
+    def rsp_twos():
+        # build the row_sparse value of all twos directly, not by converting a dense one
+        return mx.nd.sparse.row_sparse_array(np.full(shape, 2.), np.arange(shape[0]), shape)
+
     def check_invalid_single_kv_pair(kv, key):
         dns_val = mx.nd.ones(shape) * 2
-        rsp_val = dns_val.tostype('row_sparse')
+        rsp_val = rsp_twos()
         kv.pull(key, out=rsp_val)
         # pull should be ignored with no values updated
         check_diff_to_scalar(rsp_val, 2)
@@ -243,7 +246,7 @@ def test_invalid_pull():
 
     def check_invalid_list_kv_pair(kv, key):
         dns_val = [mx.nd.ones(shape) * 2] * len(key)
-        rsp_val = [val.tostype('row_sparse') for val in dns_val]
+        rsp_val = [rsp_twos() for _ in key]
         kv.pull(key, out=rsp_val)
         for v in rsp_val:
             # pull should be ignored with no values updated
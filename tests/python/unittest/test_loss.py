@@ -51,6 +51,52 @@ def test_loss_ndarray():
     L = loss(output, label, weighting).asnumpy()
     mx.test_utils.assert_almost_equal(L, np.array([ 1.06346405,  0.04858733]))
 
+    L = loss(output, label.astype('uint8')).asnumpy()
+    mx.test_utils.assert_almost_equal(L, np.array([ 2.12692809,  0.04858733]))
+
+
+def test_loss_ndarray_record():
+    output = mx.nd.array([[0.2, 0.8], [0.6, 0.4]])
+    label = mx.nd.array([[0., 1.], [1., 0.]])
+    losses = [gluon.loss.L1Loss(), gluon.loss.L2Loss(),
+              gluon.loss.SigmoidBCELoss(from_sigmoid=True),
+              gluon.loss.SoftmaxCELoss(sparse_label=False),
+              gluon.loss.KLDivLoss(from_logits=False)]
+    for loss in losses:
+        L = loss(output, label).asnumpy()
+        with mx.autograd.record():
+            L_record = loss(output, label).asnumpy()
+        assert_almost_equal(L, L_record)
+
+
+def test_loss_ndarray_float16():
+    output = mx.nd.array([1, 2, 3, 4], dtype='float16')
+    label = mx.nd.array([1, 3, 5, 7])
+    weighting = mx.nd.array([0.5, 1, 0.5, 1])
+    for loss in [gluon.loss.L1Loss(), gluon.loss.L2Loss()]:
+        L = loss(output, label, weighting)
+        assert L.dtype == np.float16
+        assert_almost_equal(L.asnumpy(), loss(output.astype('float32'), label, weighting).asnumpy())
+
+    # the per-sample sums exceed what float16 represents exactly
+    output = mx.nd.zeros((2, 1000), dtype='float16')
+    label = mx.nd.full((2, 1000), 3)
+    weighting = mx.nd.array([[0.5], [1]])
+    for loss in [gluon.loss.L1Loss(), gluon.loss.L2Loss()]:
+        L = loss(output, label, weighting)
+        assert L.dtype == np.float16
+        assert_almost_equal(L.asnumpy(), loss(output.astype('float32'), label, weighting).asnumpy())
+
+        grads = []
+        for dtype in ['float16', 'float32']:
+            data = output.astype(dtype)
+            data.attach_grad()
+            with mx.autograd.record():
+                L = loss(data, label, weighting)
+            L.backward()
+            grads.append(data.grad.asnumpy())
+        assert_almost_equal(grads[0], grads[1], rtol=1e-3, atol=1e-5)
+
 
 def get_net(num_hidden):
     data = mx.symbol.Variable('data')
@@ -82,6 +128,16 @@ def test_ce_loss():
     assert mod.score(data_iter, eval_metric=mx.metric.Loss())[0][1] < 0.01
 
 
+def test_ce_loss_axis():
+    output = mx.nd.array([[[0, 2], [1, 4], [3, 1]]])
+    label = mx.nd.array([[2, 1]])
+    loss = gluon.loss.SoftmaxCrossEntropyLoss(axis=1)
+    x = output.asnumpy()
+    log_p = x - np.log(np.exp(x).sum(axis=1, keepdims=True))
+    expected = -(log_p[0, 2, 0] + log_p[0, 1, 1]) / 2
+    assert_almost_equal(loss(output, label).asnumpy(), np.array([expected]))
+
+
 def test_bce_loss():
     mx.random.seed(1234)
     np.random.seed(1234)
@@ -100,6 +156,23 @@ def test_bce_loss():
             eval_metric=mx.metric.Loss())
     assert mod.score(data_iter, eval_metric=mx.metric.Loss())[0][1] < 0.01
 
+def test_bce_loss_logits():
+    output = mx.nd.array([[-100., -1.], [0., 2.], [1., 100.]])
+    label = mx.nd.array([[0., 1.], [1., 0.], [1., 1.]])
+    loss = gluon.loss.SigmoidBinaryCrossEntropyLoss()
+    x, t = output.asnumpy(), label.asnumpy()
+    expected = np.maximum(x, 0) - x * t + np.log1p(np.exp(-np.abs(x)))
+    assert_almost_equal(loss(output, label).asnumpy(), expected.mean(axis=1))
+
+    # the gradient is sigmoid(x) - t, also at zero logits
+    output = mx.nd.zeros((2, 2))
+    label = mx.nd.array([[0., 1.], [1., 0.]])
+    output.attach_grad()
+    with mx.autograd.record():
+        L = loss(output, label)
+    L.backward()
+    assert_almost_equal(output.grad.asnumpy(), (0.5 - label.asnumpy()) / 2)
+
 def test_bce_equal_ce2():
     N = 100
     loss1 = gluon.loss.SigmoidBCELoss(from_sigmoid=True)